@@ -0,0 +1,32 @@
+import unittest
+
+import pandas as pd
+
+try:
+    import cx_Oracle
+    from utilities.database import OracleCommand
+except ImportError:
+    OracleCommand = None
+
+
+@unittest.skipIf(OracleCommand is None, "cx_Oracle and pyodbc are required to import the database module.")
+class InferInputSizesTest(unittest.TestCase):
+    def test_string_column_width(self):
+        dataFrame = pd.DataFrame({'name': ['a', 'abc', None]})
+        self.assertEqual(OracleCommand.__inferInputSizes__(dataFrame), [3])
+
+    def test_empty_string_column(self):
+        dataFrame = pd.DataFrame({'name': pd.Series([], dtype='string')})
+        self.assertEqual(OracleCommand.__inferInputSizes__(dataFrame), [None])
+
+    def test_all_null_string_column(self):
+        dataFrame = pd.DataFrame({'name': pd.Series([None, None], dtype='string')})
+        self.assertEqual(OracleCommand.__inferInputSizes__(dataFrame), [None])
+
+    def test_numeric_and_datetime_columns(self):
+        dataFrame = pd.DataFrame({'count': [1, 2], 'when': pd.to_datetime(['2020-01-01', None])})
+        self.assertEqual(OracleCommand.__inferInputSizes__(dataFrame), [cx_Oracle.NUMBER, cx_Oracle.DATETIME])
+
+
+if __name__ == '__main__':
+    unittest.main()
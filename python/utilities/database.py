@@ -1,10 +1,72 @@
+import re
+from collections import defaultdict
+from contextlib import contextmanager
+
 import cx_Oracle
+import numpy as np
 import pandas as pd
 import warnings
 import pyodbc
 
+try:
+    import mssql_python
+except ImportError:
+    mssql_python = None
+
+
+def _columnToArray(column):
+    # type: (pd.Series) -> np.ndarray
+    """
+    Converts a single pandas column to a numpy array ready to be turned into python values.
+    :param column: pandas series containing the column data.
+    :return: numpy.ndarray
+
+    Numeric columns without missing values are kept in their native dtype and datetime columns are converted to
+    python datetimes in one call. NaN, NaT and None values are cast to None so they are inserted as SQL.NULL.
+    """
+    values = column.to_numpy()
+    if values.dtype.kind in 'biuf' and not column.hasnans:
+        return values
+
+    if pd.api.types.is_datetime64_any_dtype(column):
+        values = pd.DatetimeIndex(column).to_pydatetime()
+    else:
+        values = column.to_numpy(dtype=object)
+    mask = pd.isna(values)
+    # Most columns hold no missing values, in which case the values can be used as they are.
+    if not mask.any():
+        return values
+
+    return np.where(mask, None, values)
+
+
+def _iterBatches(dataFrame, batchSize):
+    # type: (pd.DataFrame,int) -> Iterator[list]
+
+    """
+    Converts a pandas data frame to database ready containers, one batch at a time.
+    :param dataFrame: pandas data frame container the data.
+    :param batchSize: Number of rows in each batch.
+    :return: generator of lists of row tuples.
+
+    The data frame is converted column by column so only columns which can hold missing values need to be
+    materialised as python objects, and rows are only built for the batch being yielded.
+    """
+    columns = [_columnToArray(column) for _, column in dataFrame.items()]
+
+    for start in range(0, dataFrame.shape[0], batchSize):
+        # Object arrays already hold python values and can be zipped as they are, native arrays are unboxed with
+        # tolist since the database drivers do not bind numpy scalars.
+        yield list(zip(*[c[start:start + batchSize] if c.dtype == object else c[start:start + batchSize].tolist()
+                         for c in columns]))
+
 
 class OracleCommand:
+    # Session pool sizing, can be overridden per instance through the constructor keyword arguments.
+    poolMin = 1
+    poolMax = 10
+    poolIncrement = 1
+
     def __init__(self, connectionString, command=None, **kwargs):
         """Constructor for the OracleCommand Class.
         Required Args:
@@ -15,51 +77,147 @@ class OracleCommand:
 
         Note** Does not support OAuth style authentication."""
         self.__cStr = connectionString
+        self.__credentials = self.__parseConnectionString__(connectionString)
         self.__command = command
+        self.__pool = None
+        self.__db = None
         if kwargs is not None:
             for key, value in kwargs.items():
                 setattr(self, key, value)
 
+    @staticmethod
+    def __parseConnectionString__(connectionString):
+        # type: (str) -> tuple
+        """
+        Splits an oracle connection string into its credentials and data source name.
+        :param connectionString: Connection string formatted as user/password@dsn.
+        :return: tuple of user, password and dsn. None if the connection string is not in that format.
+        """
+        match = re.match(r'^([^/]+)/(.*)@([^@]+)$', connectionString)
+        if match is None:
+            return None
+
+        return match.groups()
+
+    def __getPool__(self):
+        # type: () -> cx_Oracle.SessionPool
+        """
+        Returns the session pool for the connection string, creating it on first use.
+        :return: session pool. None if the connection string is not formatted as user/password@dsn, for example for
+        local or external authentication, in which case standalone connections are used.
+        """
+        if self.__pool is None and self.__credentials is not None:
+            user, password, dsn = self.__credentials
+            self.__pool = cx_Oracle.SessionPool(user=user, password=password, dsn=dsn, min=self.poolMin,
+                                                max=self.poolMax, increment=self.poolIncrement,
+                                                getmode=cx_Oracle.SPOOL_ATTRVAL_WAIT, homogeneous=True)
+
+        return self.__pool
+
+    def __releaseConnection__(self, db):
+        """Releases a connection back to the session pool, or closes it if it is a standalone connection."""
+        if self.__pool is None:
+            db.close()
+        else:
+            self.__pool.release(db)
+
     def __connect__(self):
-        """Attempts to open a connection with the oracle database specified by the connection string."""
-        self.__db = cx_Oracle.connect(self.__cStr)
-        self.__cursor = self.__db.cursor()
+        """Acquires a connection with the oracle database specified by the connection string from the session pool."""
+        pool = self.__getPool__()
+        if pool is None:
+            db = cx_Oracle.connect(self.__cStr)
+        else:
+            db = pool.acquire()
+
+        # Only keep the connection once the cursor is open, so a failure leaves no session behind.
+        try:
+            self.__cursor = db.cursor()
+        except Exception:
+            self.__releaseConnection__(db)
+            raise
+        self.__db = db
 
     def __disconnect__(self):
-        """Attempts to disconnect from a open connection to an oracle database."""
-        self.__cursor.close()
-        self.__db.close()
+        """Closes the cursor and releases the open connection back to the session pool."""
+        # The connection may have died, so the session is cleared even if closing or releasing it fails.
+        try:
+            self.__cursor.close()
+        finally:
+            try:
+                self.__releaseConnection__(self.__db)
+            finally:
+                self.__db = None
+                self.__cursor = None
+
+    def close(self):
+        """Closes the session pool, logging off its sessions. A new pool is created if the command is used again."""
+        if self.__pool is not None:
+            self.__pool.close()
+            self.__pool = None
+
+    @contextmanager
+    def session(self):
+        """
+        Keeps a single connection open for every command executed inside the with block.
+        Commands executed outside of a session acquire and release their own connection.
+        """
+        if self.__db is not None:
+            yield self
+            return
 
-    @staticmethod
-    def __pandasToList__(dataFrame):
+        self.__connect__()
+        try:
+            yield self
+        finally:
+            self.__disconnect__()
 
+    @staticmethod
+    def __groupByNullMask__(rows):
+        # type: (list) -> list
         """
-        Converts a pandas data frame to a cx_oracle ready container.
-        :param dataFrame: pandas data frame container the data.
-        :return: list
+        Groups rows by which of their columns hold None so each group binds uniformly.
+        :param rows: list of row tuples.
+        :return: list of tuples holding the positions of the grouped rows and the grouped rows.
         """
-        content = []
-        for i, r in dataFrame.iterrows():
-            row = r.values.tolist()
-            content.append(row)
+        groups = defaultdict(lambda: ([], []))
+        for i, row in enumerate(rows):
+            positions, subset = groups[tuple(v is None for v in row)]
+            positions.append(i)
+            subset.append(row)
 
-        return content
+        return list(groups.values())
 
     @staticmethod
-    def __castToNone__(value):
-        """Casts a math.NaN value to None
-        :param value: Any scalar value.
-        :return value: None if Numpy.Math.NaN else value.
+    def __inferInputSizes__(dataFrame, nativeFloats=False):
+        # type: (pd.DataFrame,bool) -> list
+        """
+        Infers the cx_Oracle bind types for each column of a pandas data frame.
+        :param dataFrame: pandas data frame containing the data.
+        :param nativeFloats: Bind float columns as binary doubles instead of oracle numbers.
+        :return: list of cx_Oracle types or maximum string lengths, None where the type should be inferred by cx_Oracle.
 
-        This method is present to correctly input SQL.NULL type values to the database.
+        Declaring the maximum string length up front stops cx_Oracle from resizing the string binds while it scans
+        each batch.
         """
-        if value != value:
-            return None
-        else:
-            return value
+        sizes = []
+        for _, column in dataFrame.items():
+            if nativeFloats and pd.api.types.is_float_dtype(column):
+                sizes.append(cx_Oracle.NATIVE_FLOAT)
+            elif pd.api.types.is_bool_dtype(column) or pd.api.types.is_numeric_dtype(column):
+                sizes.append(cx_Oracle.NUMBER)
+            elif pd.api.types.is_datetime64_any_dtype(column):
+                sizes.append(cx_Oracle.DATETIME)
+            elif pd.api.types.infer_dtype(column, skipna=True) == 'string':
+                # Empty and all null text columns have no maximum length, leave those to cx_Oracle.
+                width = column.str.len().max()
+                sizes.append(None if pd.isna(width) else max(int(width), 1))
+            else:
+                sizes.append(None)
+
+        return sizes
 
     @staticmethod
-    def __buildInsertStrObj__(colNames, ToUpper=False):
+    def __buildInsertStrObj__(colNames):
         # type: (list) -> tuple
         """
         Constructs a column names and column numbers query string for sql function based on a list of column names.
@@ -67,57 +225,55 @@ class OracleCommand:
         :return: string of column names with parenthesis. string of column indexes with parenthesis.
         """
 
-        _open = '('
-        _close = ')'
-        _sep = ','
-        _colNameStr = ''
-        _colNumstr = ''
-
-        if ToUpper:
-            colNames = map(lambda x: x.upper(), colNames)
-
-        for i, c in enumerate(colNames):
-            if i == 0:
-                _colNameStr += _open
-                _colNameStr += """"%s" """ % c
-                _colNameStr = _colNameStr.rstrip()
-
-                _colNumstr += _open
-                _colNumstr += ':' + str(i + 1)
-
-            else:
-                _colNameStr += _sep
-                _colNameStr += """"%s" """ % c
-                _colNameStr = _colNameStr.rstrip()
-
-                _colNumstr += _sep
-                _colNumstr += ':' + str(i + 1)
-
-        _colNameStr += _close
-        _colNumstr += _close
+        _colNameStr = '(' + ','.join('"%s"' % c for c in colNames) + ')'
+        _colNumstr = '(' + ','.join(':%d' % (i + 1) for i in range(len(colNames))) + ')'
 
         return _colNameStr, _colNumstr
 
     @staticmethod
-    def __buildInsCursorString__(tableName, colNumStr, colNameStr):
-        # type: (str,str,str) -> str
+    def __buildInsCursorString__(tableName, colNumStr, colNameStr, directPath=False, parallel=None):
+        # type: (str,str,str,bool,int) -> str
         """This method generates a cursor string for the insert statements.
         :param tableName: Name of the target table to be inserted into as string.
         :param colNumStr: String of column numbers to be targeted.
         :param colNameStr: String of column names to be targeted.
+        :param directPath: Add the APPEND_VALUES hint for a direct path insert.
+        :param parallel: Degree of parallelism for the PARALLEL hint, None to leave it out.
         :return String to be fed into the oracle cursor.
         """
-        return "INSERT INTO %s %s VALUES %s" % (tableName, colNameStr, colNumStr)
+        _hints = []
+        if parallel is not None:
+            # Hint table specifications cannot carry a schema prefix, so only the bare table name is used.
+            _hints.append("PARALLEL(%s,%d)" % (tableName.split('.')[-1], parallel))
+        if directPath:
+            _hints.append("APPEND_VALUES")
+
+        if not _hints:
+            return "INSERT INTO %s %s VALUES %s" % (tableName, colNameStr, colNumStr)
+
+        return "INSERT /*+ %s */ INTO %s %s VALUES %s" % (' '.join(_hints), tableName, colNameStr, colNumStr)
+
+    @staticmethod
+    def __lobOutputTypeHandler__(cursor, name, defaultType, size, precision, scale):
+        """
+        cx_Oracle output type handler which fetches LOB columns as strings and bytes.
+        LOB locators cannot be read once their connection is released, so their content is fetched directly instead.
+        """
+        if defaultType in (cx_Oracle.DB_TYPE_CLOB, cx_Oracle.DB_TYPE_NCLOB):
+            return cursor.var(cx_Oracle.LONG_STRING, arraysize=cursor.arraysize)
+        if defaultType == cx_Oracle.DB_TYPE_BLOB:
+            return cursor.var(cx_Oracle.LONG_BINARY, arraysize=cursor.arraysize)
 
     def executeScalar(self, command):
         """Executes a SQL statement which returns a scalar value."""
         raise NotImplementedError()
 
-    def executeVector(self, command=None):
-        # type: (str) -> pd.DataFrame
+    def executeVector(self, command=None, arraySize=5000):
+        # type: (str,int) -> pd.DataFrame
         """
         This method generates a pandas data frame from a sql query.
         :param command: SQL Query to be executed.
+        :param arraySize: Number of rows fetched from the database per round trip.
         :return: Pandas dataframe containing the results of the query.
         """
         warnings.warn("This method is not fully tested. Be sure to view the source code before implementation.")
@@ -126,7 +282,17 @@ class OracleCommand:
         elif command is None:
             command = self.__command
 
-        _df = pd.read_sql(command, self.__cStr)
+        with self.session():
+            # Use a dedicated cursor so the array size does not leak into later commands of an open session.
+            _cursor = self.__db.cursor()
+            try:
+                _cursor.arraysize = arraySize
+                _cursor.outputtypehandler = self.__lobOutputTypeHandler__
+                _cursor.execute(command)
+                _colNames = [d[0] for d in _cursor.description]
+                _df = pd.DataFrame.from_records(_cursor.fetchall(), columns=_colNames)
+            finally:
+                _cursor.close()
 
         return _df
 
@@ -140,10 +306,14 @@ class OracleCommand:
         elif command is None:
             command = self.__command
 
-        self.__connect__()
-        self.__cursor.execute(command)
-        self.__db.commit()
-        self.__disconnect__()
+        with self.session():
+            try:
+                self.__cursor.execute(command)
+                self.__db.commit()
+            except Exception:
+                # Do not leave the failed statement in an open session for the next commit to pick up.
+                self.__db.rollback()
+                raise
 
     def executeQueryAsync(self, command):
         """Not supported."""
@@ -153,8 +323,10 @@ class OracleCommand:
         """Executes a stored procedure."""
         raise NotImplementedError()
 
-    def pandasBulkInsert(self, dataFrame, tableName, columnNames=None, colNamesUpper=False):
-        # type: (pd.DataFrame,str,list,bool) -> None
+    def pandasBulkInsert(self, dataFrame, tableName, columnNames=None, colNamesUpper=False, batchSize=5000,
+                         commitEveryBatch=False, batchErrors=False, groupByNulls=False,
+                         nativeFloats=False, directPath=False, parallel=None):
+        # type: (pd.DataFrame,str,list,bool,int,bool,bool,bool,bool,bool,int) -> list
 
         """
         Bulk upload data to a oracle table from a pandas data frame.
@@ -162,47 +334,81 @@ class OracleCommand:
         :param tableName: Name of the destination table.
         :param columnNames: List of column names, if not specified, infer column names from the pandas dataframe. Warning, the column names have to match the destination column names.
         :param colNamesUpper: Cast column names to upper.
-        :return:
+        :param batchSize: Number of rows sent to the database per executemany call.
+        :param commitEveryBatch: Commit after every batch instead of once after the whole upload.
+        :param batchErrors: Continue past rows which fail to insert instead of aborting the upload.
+        :param groupByNulls: Send the rows of each batch in groups sharing the same null columns so the binds are uniform.
+        :param nativeFloats: Bind float columns as binary doubles, skipping the conversion to oracle numbers on the client. Best suited to BINARY_DOUBLE destination columns, NUMBER columns will store the exact binary value.
+        :param directPath: Insert above the table's high water mark with the APPEND_VALUES hint, bypassing the buffer cache. Requires exclusive access to the table and forces a commit after every executemany call, since the session cannot touch the table again until the direct path insert is committed.
+        :param parallel: Degree of parallelism to request with the PARALLEL hint, None to leave it out. Only takes effect when parallel DML has been enabled for the session (ALTER SESSION ENABLE PARALLEL DML), and even then Oracle rarely parallelises array bound INSERT ... VALUES statements, so do not expect a speedup from it on its own.
+        :return: list of cx_Oracle batch errors for the rows which failed to insert when batchErrors is set.
         """
         # If no column names specified get column names
         if columnNames is None:
-            columnNames = list(dataFrame.columns.values)
+            if colNamesUpper:
+                columnNames = dataFrame.columns.astype(str).str.upper().tolist()
+            else:
+                columnNames = list(dataFrame.columns.values)
         else:
             # Check of the number of column names provided match the number in the data frame.
             assert (len(columnNames) == dataFrame.shape[1])
+            if colNamesUpper:
+                columnNames = [c.upper() for c in columnNames]
 
-        # Call to make the data frame into a list of lists.
-        _dtList = self.__pandasToList__(dataFrame)
-
-        # Convert any Numpy.NaN values to None for SQl.NULL recognition.
-        # TODO: Can you improve this from running in O(n2)
-        for i, r in enumerate(_dtList):
-            for j, c in enumerate(r):
-                _dtList[i][j] = self.__castToNone__(c)
+        if batchSize < 1:
+            raise ValueError("batchSize must be a positive integer.")
 
         # Call to make the column names list into a string and get the string of column indexes for upload.
-        _colNameStr, _colNumStr = self.__buildInsertStrObj__(columnNames, colNamesUpper)
+        _colNameStr, _colNumStr = self.__buildInsertStrObj__(columnNames)
 
         # Call to make the cursor string
-        _curString = self.__buildInsCursorString__(tableName, _colNumStr, _colNameStr)
-
-        # Connect
-        self.__connect__()
-        # Prepare cursor
-        self.__cursor.prepare(_curString)
-        # Feed and execute upload pipe
-        self.__cursor.executemany(None, _dtList)
-        # Commit changes
-        self.__db.commit()
-
-        # Disconnect
-        self.__disconnect__()
+        _curString = self.__buildInsCursorString__(tableName, _colNumStr, _colNameStr, directPath, parallel)
+
+        # Connect, unless a session is already open
+        with self.session():
+            try:
+                # Prepare cursor
+                self.__cursor.prepare(_curString)
+                self.__cursor.bindarraysize = batchSize
+                self.__cursor.setinputsizes(*self.__inferInputSizes__(dataFrame, nativeFloats))
+                # Feed and execute upload pipe in batches to bound the size of the bound arrays. Rows are built one
+                # batch at a time with NaN values cast to None.
+                _errors = []
+                for i, batch in enumerate(_iterBatches(dataFrame, batchSize)):
+                    start = i * batchSize
+                    if groupByNulls:
+                        _groups = self.__groupByNullMask__(batch)
+                    else:
+                        _groups = [(range(len(batch)), batch)]
+                    for positions, subset in _groups:
+                        self.__cursor.executemany(None, subset, batcherrors=batchErrors)
+                        if batchErrors:
+                            for error in self.__cursor.getbatcherrors():
+                                # Offsets are reported relative to the group, make them relative to the data frame.
+                                warnings.warn("Row %d failed to insert: %s" % (start + positions[error.offset],
+                                                                               error.message))
+                                _errors.append(error)
+                        # A direct path insert has to be committed before the table can be inserted into again.
+                        if directPath:
+                            self.__db.commit()
+                    if commitEveryBatch:
+                        self.__db.commit()
+                # Commit changes
+                self.__db.commit()
+            except Exception:
+                # Do not leave the rows of a failed upload in an open session for the next commit to pick up.
+                self.__db.rollback()
+                raise
+
+        return _errors
 
     def getConnector(self):
         # type: (None) -> cx_Oracle.connection
         """
-        Returns the cx_Oracle connector object from the class. Useful since things like beautiful soup prefers this object over the connection string.
+        Returns a standalone cx_Oracle connector object from the class. Useful since things like beautiful soup prefers this object over the connection string.
         :return: connection object.
+
+        The connection does not come from the session pool, so holding on to it never starves the pool.
         """
 
         return cx_Oracle.connect(self.__cStr)
@@ -230,5 +436,55 @@ class SqlServerCommand:
     def executeVector(self):
         pass
 
+    def pandasBulkInsert(self, dataFrame, tableName, columnNames=None, batchSize=50000, useBulkCopy=False):
+        # type: (pd.DataFrame,str,list,int,bool) -> None
+        """
+        Bulk upload data to a sql server table from a pandas data frame.
+        :param dataFrame: pandas.DataFrame containing data.
+        :param tableName: Name of the destination table.
+        :param columnNames: List of column names, if not specified, infer column names from the pandas dataframe. Warning, the column names have to match the destination column names.
+        :param batchSize: Number of rows sent to the database per call.
+        :param useBulkCopy: Upload through the TDS bulk copy protocol, requires the mssql-python package. Bulk copy maps the columns by position.
+        :return:
+        """
+        if columnNames is None:
+            columnNames = list(dataFrame.columns.values)
+        else:
+            assert (len(columnNames) == dataFrame.shape[1])
+
+        if batchSize < 1:
+            raise ValueError("batchSize must be a positive integer.")
+
+        if useBulkCopy and mssql_python is None:
+            warnings.warn("mssql-python is not installed, falling back to fast_executemany.")
+            useBulkCopy = False
+
+        if useBulkCopy:
+            _con = mssql_python.connect(self.__cStr)
+        else:
+            _con = pyodbc.connect(self.__cStr, autocommit=False)
+        _cur = _con.cursor()
+
+        try:
+            if useBulkCopy:
+                # The rows are already split into batches of batchSize, so each call is sent as a single batch.
+                for batch in _iterBatches(dataFrame, batchSize):
+                    _cur.bulkcopy(tableName, batch, table_lock=True)
+            else:
+                _curString = "INSERT INTO %s (%s) VALUES (%s)" % (tableName,
+                                                                   ','.join('[%s]' % c for c in columnNames),
+                                                                   ','.join('?' * len(columnNames)))
+                # Send the parameters as arrays instead of one round trip per row.
+                _cur.fast_executemany = True
+                for batch in _iterBatches(dataFrame, batchSize):
+                    _cur.executemany(_curString, batch)
+            _con.commit()
+        except Exception:
+            _con.rollback()
+            raise
+        finally:
+            _cur.close()
+            _con.close()
+
     def getConnector(self):
         return pyodbc.connect(self.__cStr, autocommit=True)